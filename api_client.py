@@ -1,54 +1,94 @@
 import httpx
+import orjson
 from typing import Any, Optional
-from config import API_GATEWAY_URL, API_KEY, REQUEST_TIMEOUT
+from cachetools import TTLCache
+from config import get_settings
 
 
 class APIClient:
     """HTTP client for communicating with the API Gateway"""
 
     def __init__(self):
-        self.base_url = API_GATEWAY_URL
-        self.headers = {
-            "X-API-Key": API_KEY,
-            "Content-Type": "application/json"
-        }
+        self._client: httpx.AsyncClient | None = None
+        # Short-lived cache for idempotent GETs (schema/table/procedure lists)
+        self._cache = TTLCache(maxsize=1024, ttl=60)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it lazily on first use"""
+        if self._client is None or self._client.is_closed:
+            settings = get_settings()
+            self._client = httpx.AsyncClient(
+                base_url=settings.api_gateway_url,
+                headers={
+                    "X-API-Key": settings.api_key,
+                    "Content-Type": "application/json"
+                },
+                timeout=settings.request_timeout,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                http2=True
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close the shared client and its connection pool"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    async def __aenter__(self) -> "APIClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _handle_error(self, e: Exception) -> dict[str, Any]:
+        """Map a request exception to the error-dict returned to tools"""
+        if isinstance(e, httpx.HTTPStatusError):
+            return {"error": f"HTTP {e.response.status_code}: {e.response.text}"}
+        if isinstance(e, httpx.ConnectError):
+            return {"error": "Cannot connect to API Gateway. Is it running?"}
+        return {"error": str(e)}
+
+    async def _request(
+        self, method: str, endpoint: str, json: dict[str, Any] | None = None
+    ) -> Optional[dict[str, Any]]:
+        """Execute a request to the API Gateway"""
+        client = self._get_client()
+        try:
+            # orjson is noticeably faster than stdlib json on large query results
+            content = orjson.dumps(json) if json is not None else None
+            response = await client.request(method, endpoint, content=content)
+            response.raise_for_status()
+            return orjson.loads(response.content)
+        except Exception as e:
+            return self._handle_error(e)
 
     async def get(self, endpoint: str) -> Optional[dict[str, Any]]:
-        """Execute GET request to API Gateway"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}{endpoint}",
-                    headers=self.headers,
-                    timeout=REQUEST_TIMEOUT
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                return {"error": f"HTTP {e.response.status_code}: {e.response.text}"}
-            except httpx.ConnectError:
-                return {"error": "Cannot connect to API Gateway. Is it running?"}
-            except Exception as e:
-                return {"error": str(e)}
+        """Execute GET request to API Gateway (responses cached for 60s)"""
+        cached = self._cache.get(endpoint)
+        if cached is not None:
+            return cached
+        data = await self._request("GET", endpoint)
+        if data is not None and "error" not in data:
+            self._cache[endpoint] = data
+        return data
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Drop cached GET responses whose endpoint starts with prefix"""
+        for key in [k for k in self._cache if k.startswith(prefix)]:
+            self._cache.pop(key, None)
 
     async def post(self, endpoint: str, data: dict[str, Any]) -> Optional[dict[str, Any]]:
         """Execute POST request to API Gateway"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}{endpoint}",
-                    headers=self.headers,
-                    json=data,
-                    timeout=REQUEST_TIMEOUT
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                return {"error": f"HTTP {e.response.status_code}: {e.response.text}"}
-            except httpx.ConnectError:
-                return {"error": "Cannot connect to API Gateway. Is it running?"}
-            except Exception as e:
-                return {"error": str(e)}
+        return await self._request("POST", endpoint, json=data)
+
+    async def batch(self, calls: list[tuple[str, str]]) -> list[dict[str, Any]]:
+        """Execute multiple (method, path) calls in a single /batch round-trip"""
+        payload = {"requests": [{"method": method, "path": path} for method, path in calls]}
+        data = await self._request("POST", "/batch", json=payload)
+        if not data or "error" in data:
+            error = data if data else {"error": "No response from API Gateway"}
+            return [error] * len(calls)
+        return data.get("responses", [])
 
 
 # Singleton instance
@@ -1,11 +1,24 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
-load_dotenv()
 
-# API Gateway configuration
-API_GATEWAY_URL = os.getenv("API_GATEWAY_URL", "http://localhost:3000/api/v1")
-API_KEY = os.getenv("API_KEY", "")
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """API Gateway connection settings"""
+    api_gateway_url: str
+    api_key: str
+    request_timeout: float
 
-# Request timeout (seconds)
-REQUEST_TIMEOUT = 30.0
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings on first use (.env is read here, not at import time)"""
+    load_dotenv()
+    return Settings(
+        api_gateway_url=os.getenv("API_GATEWAY_URL", "http://localhost:3000/api/v1"),
+        api_key=os.getenv("API_KEY", ""),
+        # Request timeout (seconds)
+        request_timeout=float(os.getenv("REQUEST_TIMEOUT", "30")),
+    )
@@ -1,19 +1,21 @@
 from typing import Any
+import io
 import json
-import hashlib
-from datetime import datetime, timedelta
+import re
+import secrets
+from collections import Counter
 from dataclasses import dataclass
+from cachetools import TTLCache
 from mcp.server.fastmcp import FastMCP
 from api_client import api_client
 
 
-@dataclass
+@dataclass(slots=True)
 class QueryPreview:
     """쿼리 미리보기 정보를 저장하는 데이터 클래스"""
     database: str
     query: str
     query_hash: str
-    timestamp: datetime
     query_type: str
     context: dict
 
@@ -22,33 +24,28 @@ class QueryPreviewStore:
     """쿼리 미리보기를 저장하고 관리하는 클래스"""
 
     EXPIRY_MINUTES = 5
+    MAX_PREVIEWS = 10_000
 
     def __init__(self):
-        self._previews: dict[str, QueryPreview] = {}
-
-    def _generate_hash(self, database: str, query: str) -> str:
-        """SHA-256 해시 생성 (16자)"""
-        content = f"{database}:{query}:{datetime.now().isoformat()}"
-        return hashlib.sha256(content.encode()).hexdigest()[:16]
+        # 만료는 TTLCache가 접근 시점에 처리 (수동 O(n) 정리 불필요)
+        self._previews = TTLCache(maxsize=self.MAX_PREVIEWS, ttl=self.EXPIRY_MINUTES * 60)
 
     def store(self, database: str, query: str, query_type: str, context: dict) -> QueryPreview:
         """쿼리 미리보기 저장"""
-        query_hash = self._generate_hash(database, query)
+        # 조회용 키이므로 암호화 해시 대신 랜덤 토큰 사용 (16자)
+        query_hash = secrets.token_hex(8)
         preview = QueryPreview(
             database=database,
             query=query,
             query_hash=query_hash,
-            timestamp=datetime.now(),
             query_type=query_type,
             context=context
         )
         self._previews[query_hash] = preview
-        self._cleanup_expired()
         return preview
 
     def get(self, query_hash: str) -> QueryPreview | None:
         """해시로 미리보기 조회"""
-        self._cleanup_expired()
         return self._previews.get(query_hash)
 
     def validate_and_get(self, query_hash: str, database: str) -> tuple[QueryPreview | None, str | None]:
@@ -61,29 +58,11 @@ class QueryPreviewStore:
         if preview.database != database:
             return None, f"Database mismatch. Preview was for '{preview.database}', not '{database}'."
 
-        if self._is_expired(preview):
-            del self._previews[query_hash]
-            return None, "Query preview has expired. Please generate a new preview."
-
         return preview, None
 
     def remove(self, query_hash: str) -> None:
         """미리보기 삭제"""
-        if query_hash in self._previews:
-            del self._previews[query_hash]
-
-    def _is_expired(self, preview: QueryPreview) -> bool:
-        """만료 여부 확인"""
-        expiry_time = preview.timestamp + timedelta(minutes=self.EXPIRY_MINUTES)
-        return datetime.now() > expiry_time
-
-    def _cleanup_expired(self) -> None:
-        """만료된 미리보기 정리"""
-        expired_hashes = [
-            h for h, p in self._previews.items() if self._is_expired(p)
-        ]
-        for h in expired_hashes:
-            del self._previews[h]
+        self._previews.pop(query_hash, None)
 
 
 # 전역 QueryPreviewStore 인스턴스
@@ -100,25 +79,29 @@ def format_error(data: dict[str, Any] | None) -> str:
     return data.get("error", "Unknown error occurred")
 
 
-def format_rows(rows: list[dict], max_display: int = 10) -> str:
+# 실행 결과에서 실제로 표시하는 최대 행 수
+MAX_DISPLAY_ROWS = 10
+
+
+def format_rows(rows: list[dict], max_display: int = MAX_DISPLAY_ROWS) -> str:
     """Format rows for display"""
     if not rows:
         return "No data found."
 
     total = len(rows)
-    display_rows = rows[:max_display]
-
-    result = [f"Total rows: {total}"]
+    buf = io.StringIO()
+    buf.write(f"Total rows: {total}\n")
     if total > max_display:
-        result.append(f"(Showing first {max_display} rows)")
-    result.append("")
+        buf.write(f"(Showing first {max_display} rows)\n")
+    buf.write("\n")
 
-    for i, row in enumerate(display_rows, 1):
-        result.append(f"Row {i}:")
+    for i, row in enumerate(rows[:max_display], 1):
+        buf.write(f"Row {i}:\n")
         for key, value in row.items():
-            result.append(f"  {key}: {value}")
+            buf.write(f"  {key}: {value}\n")
 
-    return "\n".join(result)
+    # join()과 동일하게 마지막 개행은 제외
+    return buf.getvalue()[:-1]
 
 
 @mcp.tool()
@@ -183,6 +166,39 @@ async def get_table_schema(database: str, table: str) -> str:
     return "\n".join(result)
 
 
+# SELECT로 시작하는 쿼리인지 검사 (전체 복사 없이 접두사만 확인)
+_SELECT_RE = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+# 미리보기 출력 템플릿 (정적 부분은 모듈 로드 시 한 번만 구성)
+_TABLE_PREVIEW_TEMPLATE = (
+    "=== QUERY PREVIEW ===\n"
+    "Database: {database}\n"
+    "Table: {table}\n"
+    "Limit: {limit} rows\n"
+    "\n"
+    "SQL to be executed:\n"
+    "{query}\n"
+    "\n"
+    "Operation: SELECT (Read-only)\n"
+    "\n"
+    'To execute, use query_hash: "{query_hash}"\n'
+    "This preview expires in 5 minutes."
+)
+
+_SELECT_PREVIEW_TEMPLATE = (
+    "=== QUERY PREVIEW ===\n"
+    "Database: {database}\n"
+    "\n"
+    "SQL to be executed:\n"
+    "{query}\n"
+    "\n"
+    "Operation: SELECT (Read-only)\n"
+    "\n"
+    'To execute, use query_hash: "{query_hash}"\n'
+    "This preview expires in 5 minutes."
+)
+
+
 @mcp.tool()
 async def preview_table_query(database: str, table: str, limit: int = 100) -> str:
     """Preview a table query before execution. User must approve before running.
@@ -202,22 +218,13 @@ async def preview_table_query(database: str, table: str, limit: int = 100) -> st
         context={"table": table, "limit": safe_limit}
     )
 
-    result = [
-        "=== QUERY PREVIEW ===",
-        f"Database: {database}",
-        f"Table: {table}",
-        f"Limit: {safe_limit} rows",
-        "",
-        "SQL to be executed:",
-        query,
-        "",
-        "Operation: SELECT (Read-only)",
-        "",
-        f'To execute, use query_hash: "{preview.query_hash}"',
-        "This preview expires in 5 minutes."
-    ]
-
-    return "\n".join(result)
+    return _TABLE_PREVIEW_TEMPLATE.format(
+        database=database,
+        table=table,
+        limit=safe_limit,
+        query=query,
+        query_hash=preview.query_hash
+    )
 
 
 @mcp.tool()
@@ -229,8 +236,7 @@ async def preview_select_query(database: str, query: str) -> str:
         query: SELECT query to preview (only SELECT queries allowed)
     """
     # 쿼리가 SELECT로 시작하는지 기본 검증
-    trimmed = query.strip().upper()
-    if not trimmed.startswith("SELECT"):
+    if not _SELECT_RE.match(query):
         return "Error: Only SELECT queries are allowed."
 
     preview = query_preview_store.store(
@@ -240,20 +246,11 @@ async def preview_select_query(database: str, query: str) -> str:
         context={"custom_query": True}
     )
 
-    result = [
-        "=== QUERY PREVIEW ===",
-        f"Database: {database}",
-        "",
-        "SQL to be executed:",
-        query,
-        "",
-        "Operation: SELECT (Read-only)",
-        "",
-        f'To execute, use query_hash: "{preview.query_hash}"',
-        "This preview expires in 5 minutes."
-    ]
-
-    return "\n".join(result)
+    return _SELECT_PREVIEW_TEMPLATE.format(
+        database=database,
+        query=query,
+        query_hash=preview.query_hash
+    )
 
 
 @mcp.tool()
@@ -264,15 +261,17 @@ async def analyze_table(database: str, table: str) -> str:
         database: Database name
         table: Table name
     """
-    # Get stats
-    stats_data = await api_client.get(f"/databases/{database}/tables/{table}/stats")
+    # Get stats and schema in a single /batch round-trip
+    results = await api_client.batch([
+        ("GET", f"/databases/{database}/tables/{table}/stats"),
+        ("GET", f"/databases/{database}/tables/{table}/schema"),
+    ])
+    stats_data = results[0] if len(results) > 0 else None
+    schema_data = results[1] if len(results) > 1 else None
 
     if not stats_data or "error" in stats_data:
         return f"Failed to analyze table: {format_error(stats_data)}"
 
-    # Get schema for additional info
-    schema_data = await api_client.get(f"/databases/{database}/tables/{table}/schema")
-
     result = [
         f"=== Table Analysis ===",
         f"Database: {database}",
@@ -295,10 +294,7 @@ async def analyze_table(database: str, table: str) -> str:
         result.append("")
         result.append("Column types summary:")
 
-        type_counts: dict[str, int] = {}
-        for col in columns:
-            col_type = col.get("type", "unknown")
-            type_counts[col_type] = type_counts.get(col_type, 0) + 1
+        type_counts = Counter(col.get("type", "unknown") for col in columns)
 
         for col_type, count in sorted(type_counts.items()):
             result.append(f"  - {col_type}: {count}")
@@ -320,13 +316,16 @@ async def execute_confirmed_query(database: str, query_hash: str) -> str:
     if error:
         return f"Error: {error}"
 
-    # 쿼리 실행
-    payload = {"query": preview.query}
+    # 쿼리 실행 (표시할 행만 받도록 서버 측 상한 전달)
+    payload = {"query": preview.query, "maxRows": MAX_DISPLAY_ROWS}
     data = await api_client.post(f"/databases/{database}/query", payload)
 
     # 사용된 미리보기 삭제
     query_preview_store.remove(query_hash)
 
+    # 쿼리 실행 후에는 해당 DB의 캐시된 조회 결과를 무효화
+    api_client.invalidate_prefix(f"/databases/{database}")
+
     if not data or "error" in data:
         return f"Failed to execute query: {format_error(data)}"
 
@@ -337,7 +336,7 @@ async def execute_confirmed_query(database: str, query_hash: str) -> str:
         "=== QUERY EXECUTED ===",
         f"Database: {database}",
         f"Query: {preview.query}",
-        f"Rows returned: {len(rows)}",
+        f"Rows returned: {data.get('rowCount', len(rows))}",
     ]
 
     if limited:
@@ -348,7 +347,7 @@ async def execute_confirmed_query(database: str, query_hash: str) -> str:
     if not rows:
         result.append("Query returned no results.")
     else:
-        result.append(format_rows(rows, max_display=10))
+        result.append(format_rows(rows, max_display=MAX_DISPLAY_ROWS))
 
     return "\n".join(result)
 